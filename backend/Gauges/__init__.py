@@ -3,7 +3,9 @@ Gauges package for analytics metrics and dashboard data.
 Each gauge represents a specific metric that can be displayed on the dashboard.
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+from datetime import datetime
+from functools import lru_cache
 import asyncio
 import logging
 
@@ -21,4 +23,28 @@ class GaugeResult:
             "value": self.value,
             "label": self.label,
             "description": self.description
-        }
\ No newline at end of file
+        }
+
+@lru_cache(maxsize=128)
+def format_date_range(start_date: Optional[datetime], end_date: Optional[datetime]) -> str:
+    """Log suffix describing a gauge's date window, formatted once per distinct window."""
+    if start_date and end_date:
+        return f" ({start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')})"
+    return ""
+
+async def run_all(client, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> List[Any]:
+    """
+    Run the OpenSearch chat/thread gauges concurrently instead of one after another.
+    Results are returned in order (active, medium, thread); with return_exceptions=True
+    a failing gauge yields its exception instead of cancelling the others.
+    """
+    from .active_chat_users_gauge import ActiveChatUsersGauge
+    from .medium_chat_users_gauge import MediumChatUsersGauge
+    from .thread_users_gauge import ThreadUsersGauge
+
+    return await asyncio.gather(
+        ActiveChatUsersGauge(client).get_gauge_data(start_date, end_date),
+        MediumChatUsersGauge(client).get_gauge_data(start_date, end_date),
+        ThreadUsersGauge(client).get_gauge_data(start_date, end_date),
+        return_exceptions=True
+    )
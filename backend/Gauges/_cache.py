@@ -0,0 +1,73 @@
+"""
+In-memory TTL cache for gauge results.
+"""
+import asyncio
+import functools
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Optional
+from cachetools import TTLCache
+
+DEFAULT_TTL = 60  # Seconds a windowed result stays cached
+ALL_TIME_TTL = 300  # "All Time" (no date range) barely moves, so keep it longer
+
+
+def gauge_cache_key(gauge: Any, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> Hashable:
+    """Default cache key: the gauge class plus the requested date range."""
+    return (type(gauge).__name__, start_date, end_date)
+
+
+def gauge_succeeded(result: Any) -> bool:
+    """Default cache predicate: skip the error GaugeResult a gauge returns when its query fails."""
+    return not str(result.get("description", "")).startswith("Error")
+
+
+def ttl_cache_async(
+    key: Callable[..., Hashable] = gauge_cache_key,
+    maxsize: int = 256,
+    ttl: int = DEFAULT_TTL,
+    all_time_ttl: int = ALL_TIME_TTL,
+    should_cache: Callable[[Any], bool] = gauge_succeeded
+):
+    """
+    Cache a gauge's `get_gauge_data(start_date, end_date)` coroutine.
+
+    Concurrent misses for the same key share a lock, so only the first caller
+    queries the backend and the rest are served from the cache it fills.
+    Results rejected by `should_cache` are returned but not stored, so a
+    transient failure is retried on the next call instead of being served for a TTL.
+    """
+    def decorator(func):
+        windowed_cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        all_time_cache = TTLCache(maxsize=maxsize, ttl=all_time_ttl)
+        locks: Dict[Hashable, asyncio.Lock] = {}
+
+        @functools.wraps(func)
+        async def wrapper(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None):
+            cache_key = key(self, start_date, end_date)
+            cache = all_time_cache if start_date is None and end_date is None else windowed_cache
+
+            # Results are copied in and out so callers can't modify the cached dict
+            try:
+                return dict(cache[cache_key])
+            except KeyError:
+                pass
+
+            lock = locks.setdefault(cache_key, asyncio.Lock())
+            try:
+                async with lock:
+                    try:
+                        return dict(cache[cache_key])
+                    except KeyError:
+                        pass
+
+                    result = await func(self, start_date, end_date)
+                    if should_cache(result):
+                        cache[cache_key] = dict(result)
+                    return result
+            finally:
+                if not lock.locked():
+                    locks.pop(cache_key, None)
+
+        return wrapper
+
+    return decorator
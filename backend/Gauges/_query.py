@@ -0,0 +1,102 @@
+"""
+Shared OpenSearch query bodies for the event-based gauges.
+
+Bodies are memoized per (filter, date window), so repeated polls for the same window
+reuse one dict and serialize to identical bytes for the shard request cache.
+Callers must treat the returned dicts as read-only.
+"""
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+# Painless scripts counting messages per trace_id and returning how many users fall
+# between params.min_count and params.max_count (null for no upper bound)
+_INIT_SCRIPT = "state.counts = new HashMap();"
+_MAP_SCRIPT = (
+    "if (doc['trace_id.keyword'].size() > 0) { String id = doc['trace_id.keyword'].value; "
+    "state.counts.put(id, state.counts.getOrDefault(id, 0) + 1); }"
+)
+_COMBINE_SCRIPT = "return state.counts;"
+_REDUCE_SCRIPT = (
+    "Map totals = new HashMap(); for (s in states) { if (s != null) { for (e in s.entrySet()) { "
+    "totals.put(e.getKey(), totals.getOrDefault(e.getKey(), 0) + e.getValue()); } } } "
+    "int n = 0; for (c in totals.values()) { if (c >= params.min_count && "
+    "(params.max_count == null || c <= params.max_count)) { n++; } } return n;"
+)
+
+
+def _window_ms(start_date: Optional[datetime], end_date: Optional[datetime]) -> Tuple[Optional[int], Optional[int]]:
+    if start_date and end_date:
+        return int(start_date.timestamp() * 1000), int(end_date.timestamp() * 1000)
+    return None, None
+
+
+def _event_query(event_filter: Dict[str, Any], lo_ms: Optional[int], hi_ms: Optional[int]) -> Dict[str, Any]:
+    must = [event_filter]
+    if lo_ms is not None:
+        must.append({"range": {"timestamp": {"gte": lo_ms, "lt": hi_ms}}})
+    return {"bool": {"must": must}}
+
+
+@lru_cache(maxsize=256)
+def _user_message_query(threshold_min: int, threshold_max: Optional[int], lo_ms: Optional[int], hi_ms: Optional[int]) -> Dict[str, Any]:
+    return {
+        "track_total_hits": False,
+        "aggs": {
+            "users_by_messages": {
+                "scripted_metric": {
+                    "params": {
+                        "min_count": threshold_min,
+                        "max_count": threshold_max
+                    },
+                    "init_script": _INIT_SCRIPT,
+                    "map_script": _MAP_SCRIPT,
+                    "combine_script": _COMBINE_SCRIPT,
+                    "reduce_script": _REDUCE_SCRIPT
+                }
+            }
+        },
+        "query": _event_query(
+            {"term": {"event_name.keyword": "handleMessageInThread_start"}}, lo_ms, hi_ms
+        )
+    }
+
+
+@lru_cache(maxsize=256)
+def _unique_users_query(event_names: Tuple[str, ...], lo_ms: Optional[int], hi_ms: Optional[int]) -> Dict[str, Any]:
+    if len(event_names) == 1:
+        event_filter = {"term": {"event_name.keyword": event_names[0]}}
+    else:
+        event_filter = {"terms": {"event_name.keyword": list(event_names)}}
+
+    return {
+        "track_total_hits": False,
+        "aggs": {
+            "unique_users": {
+                "cardinality": {
+                    "field": "trace_id.keyword",
+                    "precision_threshold": 40000
+                }
+            }
+        },
+        "query": _event_query(event_filter, lo_ms, hi_ms)
+    }
+
+
+def build_user_message_query(
+    threshold_min: int,
+    threshold_max: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Count users with threshold_min..threshold_max handleMessageInThread_start events."""
+    return _user_message_query(threshold_min, threshold_max, *_window_ms(start_date, end_date))
+
+
+def build_unique_users_query(
+    event_names: Tuple[str, ...],
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Count distinct trace_ids with any of `event_names`."""
+    return _unique_users_query(tuple(event_names), *_window_ms(start_date, end_date))
@@ -2,21 +2,129 @@
 Gauge for counting total number of users and new signups in Descope.
 """
 import os
+import asyncio
 import aiohttp
 import logging
+import orjson
 import ssl
 import certifi
+import ijson
+import numpy as np
+from array import array
 from datetime import datetime
 from typing import Dict, Any, Optional, Tuple
 from . import GaugeResult
+from ._cache import ttl_cache_async
 
 logger = logging.getLogger(__name__)
 
 class DescopeUsersGauge:
+    """
+    Total users and new signups from the Descope management API.
+
+    Keep one long-lived instance for the application. All instances share a single
+    HTTP session and heartbeat task, created on first use and stopped by aclose().
+    """
+
+    # Shared across instances so a gauge built per request doesn't leak a session
+    # and its heartbeat when it is dropped without aclose()
+    _session: Optional[aiohttp.ClientSession] = None
+    _keepalive_task: Optional[asyncio.Task] = None
+    keepalive_interval = 10  # Seconds between heartbeat requests
+
     def __init__(self):
         self.api_url = os.getenv("DESCOPE_API_URL", "https://api.descope.com/v1/mgmt/user/search")
         self.bearer_token = os.getenv("DESCOPE_BEARER_TOKEN")
+        self.tenant_ids = [t for t in os.getenv("DESCOPE_TENANT_IDS", "").split(",") if t]
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Return the shared session, creating it on first use so TCP/TLS connections
+        are reused across refreshes. The connector is built here rather than in
+        __init__ because aiohttp expects a running event loop.
+        """
+        cls = type(self)
+        if cls._session is None or cls._session.closed:
+            # Create SSL context with certifi certificates
+            connector = aiohttp.TCPConnector(
+                ssl=ssl.create_default_context(cafile=certifi.where()),
+                limit=10,
+                keepalive_timeout=300,
+                enable_cleanup_closed=True
+            )
+            cls._session = aiohttp.ClientSession(connector=connector)
+
+        if cls._keepalive_task is None or cls._keepalive_task.done():
+            cls._keepalive_task = asyncio.create_task(cls._keepalive_loop(self.api_url))
+        return cls._session
 
+    @classmethod
+    async def _keepalive_loop(cls, url: str):
+        """Send a cheap HEAD request periodically so pooled connections never sit idle."""
+        while True:
+            await asyncio.sleep(cls.keepalive_interval)
+            try:
+                async with cls._session.head(url) as response:
+                    await response.release()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"Descope keepalive request failed: {str(e)}")
+
+    async def aclose(self):
+        """Close the shared session and stop the heartbeat. Call this on application shutdown."""
+        cls = type(self)
+        if cls._keepalive_task is not None:
+            cls._keepalive_task.cancel()
+            try:
+                await cls._keepalive_task
+            except asyncio.CancelledError:
+                pass
+            cls._keepalive_task = None
+
+        if cls._session is not None and not cls._session.closed:
+            await cls._session.close()
+        cls._session = None
+
+    def _post_search(self, headers: Dict[str, str], body: Dict[str, Any]):
+        """Start a user search request against Descope, scoped to the configured tenants."""
+        if self.tenant_ids:
+            body = {**body, "tenantIds": self.tenant_ids}
+        return self._get_session().post(self.api_url, headers=headers, json=body)
+
+    async def _search_users(self, headers: Dict[str, str], body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """POST a user search to Descope, returning the parsed body or None on failure."""
+        async with self._post_search(headers, body) as response:
+            if response.status != 200:
+                logger.error(f"Failed to fetch Descope users: {response.status}")
+                return None
+            return orjson.loads(await response.read())
+
+    async def _count_from_full_scan(self, headers: Dict[str, str], window_ms: Optional[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+        """
+        Stream the full user list and count (total_users, new_signups) locally.
+        Users are parsed as bytes arrive and only their createdTime is kept; the window
+        is then counted with one int64 comparison rather than per-user datetimes.
+        """
+        created = array("q")
+        async with self._post_search(headers, {}) as response:
+            if response.status != 200:
+                logger.error(f"Failed to fetch Descope users: {response.status}")
+                return None
+
+            async for user in ijson.items(response.content, "users.item"):
+                created.append(int(user.get("createdTime", 0)))
+
+        new_signups = 0
+        if window_ms is not None:
+            lo_ms, hi_ms = window_ms
+            created_times = np.array(created, dtype=np.int64)
+            new_signups = int(((created_times >= lo_ms) & (created_times <= hi_ms)).sum())
+
+        return len(created), new_signups
+
+    # Failures come back as all-zero counts, and a real tenant always has users
+    @ttl_cache_async(should_cache=lambda result: result["total_users"] > 0)
     async def get_gauge_data(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> Dict[str, Any]:
         """
         Get gauge data in a format suitable for the dashboard.
@@ -28,44 +136,58 @@ class DescopeUsersGauge:
                 "Content-Type": "application/json"
             }
 
-            # Create SSL context with certifi certificates
-            ssl_context = ssl.create_default_context(cafile=certifi.where())
-            
-            connector = aiohttp.TCPConnector(ssl=ssl_context)
-            async with aiohttp.ClientSession(connector=connector) as session:
-                async with session.post(self.api_url, headers=headers, json={}) as response:
-                    if response.status != 200:
-                        logger.error(f"Failed to fetch Descope users: {response.status}")
-                        return {
-                            "total_users": 0,
-                            "new_signups": 0
-                        }
-
-                    data = await response.json()
-                    users = data.get("users", [])
-                    
-                    # Count total users
-                    total_users = len(users)
-                    
-                    # Count new signups within the period if dates are provided
-                    new_signups = 0
-                    if start_date and end_date:
-                        for user in users:
-                            created_at = datetime.fromtimestamp(user.get("createdTime", 0) / 1000)
-                            if start_date <= created_at <= end_date:
-                                new_signups += 1
-                        
-                        logger.info(f"Found {new_signups} new users between {start_date} and {end_date}")
-                    
-                    logger.info(f"Found {total_users} total users in Descope")
+            # Signup window in epoch ms, computed once and compared as plain ints
+            window_ms = None
+            if start_date and end_date:
+                window_ms = (int(start_date.timestamp() * 1000), int(end_date.timestamp() * 1000))
+
+            # Descope filters by creation time and reports the match count in "total",
+            # so neither query has to pull the whole user table
+            total_query = self._search_users(headers, {"limit": 1})
+            if window_ms is not None:
+                signups_query = self._search_users(headers, {
+                    "fromCreatedTime": window_ms[0],
+                    "toCreatedTime": window_ms[1],
+                    "limit": 1
+                })
+                total_data, signups_data = await asyncio.gather(total_query, signups_query)
+            else:
+                total_data, signups_data = await total_query, None
+
+            if total_data is None or (window_ms is not None and signups_data is None):
+                return {
+                    "total_users": 0,
+                    "new_signups": 0
+                }
+
+            if "total" in total_data and (signups_data is None or "total" in signups_data):
+                # Count total users
+                total_users = total_data["total"]
+
+                # Count new signups within the period if dates are provided
+                new_signups = signups_data["total"] if signups_data is not None else 0
+            else:
+                # No server-side counts available, fall back to scanning every user
+                counts = await self._count_from_full_scan(headers, window_ms)
+                if counts is None:
                     return {
-                        "total_users": total_users,
-                        "new_signups": new_signups
+                        "total_users": 0,
+                        "new_signups": 0
                     }
+                total_users, new_signups = counts
+
+            if window_ms is not None:
+                logger.info(f"Found {new_signups} new users between {start_date} and {end_date}")
+
+            logger.info(f"Found {total_users} total users in Descope")
+            return {
+                "total_users": total_users,
+                "new_signups": new_signups
+            }
 
         except Exception as e:
             logger.error(f"Error fetching Descope users: {str(e)}")
             return {
                 "total_users": 0,
                 "new_signups": 0
-            }
\ No newline at end of file
+            }
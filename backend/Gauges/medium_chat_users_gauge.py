@@ -5,7 +5,9 @@ import logging
 from typing import Dict, Any, Optional
 from datetime import datetime
 from opensearchpy import AsyncOpenSearch
-from . import GaugeResult
+from . import GaugeResult, format_date_range
+from ._cache import ttl_cache_async
+from ._query import build_user_message_query
 
 logger = logging.getLogger(__name__)
 
@@ -14,68 +16,22 @@ class MediumChatUsersGauge:
         self.client = client
         self.index = "events-v2"
 
-    async def get_gauge_data(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> Dict[str, Any]:
-        """Get gauge data in a format suitable for the dashboard."""
+    def build_query(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> Dict[str, Any]:
+        """Build the search body for this gauge."""
+        return build_user_message_query(5, 20, start_date, end_date)
+
+    def process_response(self, response: Dict[str, Any], start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> Dict[str, Any]:
+        """Turn this gauge's search response into gauge data."""
         try:
-            query = {
-                "aggs": {
-                    "users_by_messages": {
-                        "terms": {
-                            "field": "trace_id.keyword",
-                            "size": 10000  # Large enough to get all users
-                        },
-                        "aggs": {
-                            "message_count": {
-                                "value_count": {
-                                    "field": "event_name.keyword"
-                                }
-                            },
-                            "medium_users_bucket_selector": {
-                                "bucket_selector": {
-                                    "buckets_path": {
-                                        "count": "message_count"
-                                    },
-                                    "script": "params.count >= 5 && params.count <= 20"
-                                }
-                            }
-                        }
-                    }
-                },
-                "query": {
-                    "bool": {
-                        "must": [
-                            {"term": {"event_name.keyword": "handleMessageInThread_start"}}
-                        ]
-                    }
-                }
-            }
+            if "error" in response:
+                raise RuntimeError(response["error"])
 
-            # Add date range if provided
-            if start_date and end_date:
-                query["query"]["bool"]["must"].append({
-                    "range": {
-                        "timestamp": {
-                            "gte": int(start_date.timestamp() * 1000),
-                            "lt": int(end_date.timestamp() * 1000)
-                        }
-                    }
-                })
+            user_count = int(response.get('aggregations', {}).get('users_by_messages', {}).get('value') or 0)
 
-            response = await self.client.search(
-                index=self.index,
-                body=query,
-                size=0
-            )
+            date_range = format_date_range(start_date, end_date)
 
-            buckets = response.get('aggregations', {}).get('users_by_messages', {}).get('buckets', [])
-            user_count = len(buckets)
-            
-            date_range = ""
-            if start_date and end_date:
-                date_range = f" ({start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')})"
-            
             logger.info(f"Found {user_count} medium chat users{date_range}")
-            
+
             return GaugeResult(
                 value=user_count,
                 label="Medium Chat Users",
@@ -84,4 +40,23 @@ class MediumChatUsersGauge:
 
         except Exception as e:
             logger.error(f"Error counting medium chat users: {str(e)}")
-            return GaugeResult(0, "Medium Chat Users", f"Error: {str(e)}").to_dict()
\ No newline at end of file
+            return GaugeResult(0, "Medium Chat Users", f"Error: {str(e)}").to_dict()
+
+    @ttl_cache_async()
+    async def get_gauge_data(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> Dict[str, Any]:
+        """Get gauge data in a format suitable for the dashboard."""
+        try:
+            query = self.build_query(start_date, end_date)
+            response = await self.client.search(
+                index=self.index,
+                body=query,
+                size=0,
+                request_cache=True,
+                preference="dashboard"
+            )
+
+        except Exception as e:
+            logger.error(f"Error counting medium chat users: {str(e)}")
+            return GaugeResult(0, "Medium Chat Users", f"Error: {str(e)}").to_dict()
+
+        return self.process_response(response, start_date, end_date)
@@ -5,7 +5,9 @@ import logging
 from typing import Dict, Any, Optional
 from datetime import datetime
 from opensearchpy import AsyncOpenSearch
-from . import GaugeResult
+from . import GaugeResult, format_date_range
+from ._cache import ttl_cache_async
+from ._query import build_unique_users_query
 
 logger = logging.getLogger(__name__)
 
@@ -14,49 +16,23 @@ class SketchUsersGauge:
         self.client = client
         self.index = "events-v2"
 
+    @ttl_cache_async()
     async def get_gauge_data(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> Dict[str, Any]:
         """Get gauge data in a format suitable for the dashboard."""
         try:
-            query = {
-                "aggs": {
-                    "unique_users": {
-                        "cardinality": {
-                            "field": "trace_id.keyword",
-                            "precision_threshold": 40000
-                        }
-                    }
-                },
-                "query": {
-                    "bool": {
-                        "must": [
-                            {"term": {"event_name.keyword": "uploadSketch_end"}}
-                        ]
-                    }
-                }
-            }
-
-            # Add date range if provided
-            if start_date and end_date:
-                query["query"]["bool"]["must"].append({
-                    "range": {
-                        "timestamp": {
-                            "gte": int(start_date.timestamp() * 1000),
-                            "lt": int(end_date.timestamp() * 1000)
-                        }
-                    }
-                })
+            query = build_unique_users_query(("uploadSketch_end",), start_date, end_date)
 
             response = await self.client.search(
                 index=self.index,
                 body=query,
-                size=0
+                size=0,
+                request_cache=True,
+                preference="dashboard"
             )
 
             user_count = response['aggregations']['unique_users']['value']
             
-            date_range = ""
-            if start_date and end_date:
-                date_range = f" ({start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')})"
+            date_range = format_date_range(start_date, end_date)
             
             logger.info(f"Found {user_count} users with sketch uploads{date_range}")
             
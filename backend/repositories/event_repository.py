@@ -1,12 +1,34 @@
 import asyncio
 import logging
-from typing import Dict, List, Optional
+import random
+from operator import itemgetter
+from datetime import datetime, timedelta
+from typing import Dict, Hashable, List, Optional
+from aiobreaker import CircuitBreaker, CircuitBreakerError
+from cachetools import LRUCache
 from opensearchpy import AsyncOpenSearch
-from opensearchpy.exceptions import ConnectionError, TransportError
+from opensearchpy.exceptions import (
+    AuthenticationException,
+    AuthorizationException,
+    ConflictError,
+    ConnectionError,
+    NotFoundError,
+    RequestError,
+    TransportError,
+)
 from dashboardbackend.utils.query_builder import OpenSearchQueryBuilder
+from dashboardbackend.Gauges.active_chat_users_gauge import ActiveChatUsersGauge
+from dashboardbackend.Gauges.medium_chat_users_gauge import MediumChatUsersGauge
+from dashboardbackend.Gauges.thread_users_gauge import ThreadUsersGauge
 
 logger = logging.getLogger(__name__)
 
+USER_EVENT_FIELDS = ("event_name", "timestamp", "type", "event_data")
+_USER_EVENT_SOURCE = list(USER_EVENT_FIELDS)  # Shared _source filter, never mutated
+_get_user_event_fields = itemgetter(*USER_EVENT_FIELDS)
+# 4xx responses mean the request itself is wrong: retrying won't help and the cluster is healthy
+_CLIENT_ERRORS = (RequestError, AuthenticationException, AuthorizationException, NotFoundError, ConflictError)
+
 class EventRepository:
     def __init__(self, client: AsyncOpenSearch):
         self.client = client
@@ -14,16 +36,66 @@ class EventRepository:
         self.index = "events-v2"  # Default index name
         self.max_retries = 3
         self.base_delay = 1  # Base delay in seconds
+        self._semaphore = asyncio.Semaphore(32)  # Cap on in-flight queries
+        self._breaker = CircuitBreaker(
+            fail_max=5, timeout_duration=timedelta(seconds=30), exclude=list(_CLIENT_ERRORS)
+        )
+        self._last_known: LRUCache = LRUCache(maxsize=256)  # Fallback results while the circuit is open
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self.keepalive_interval = 10  # Seconds between keepalive pings
+
+    def start_keepalive(self):
+        """Start pinging the cluster in the background so pooled connections stay warm."""
+        if self._keepalive_task is None or self._keepalive_task.done():
+            self._keepalive_task = asyncio.create_task(self._keepalive_ping())
+
+    async def _keepalive_ping(self):
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            try:
+                await self.client.ping()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"OpenSearch keepalive ping failed: {str(e)}")
 
-    async def _execute_with_retry(self, operation):
-        """Execute an OpenSearch operation with exponential backoff retry."""
+    async def aclose(self):
+        """Stop the keepalive task. The client itself is owned and closed by the caller."""
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            try:
+                await self._keepalive_task
+            except asyncio.CancelledError:
+                pass
+            self._keepalive_task = None
+
+    async def _execute_with_retry(self, operation, cache_key: Optional[Hashable] = None):
+        """
+        Execute an OpenSearch operation with jittered exponential backoff retry.
+
+        At most 32 operations run at once, and repeated failures open a circuit breaker.
+        While it is open, the last successful result for `cache_key` is returned if one exists.
+        Client errors (4xx) are raised straight away and don't count towards the breaker.
+        """
         for attempt in range(self.max_retries):
             try:
-                return await operation()
+                async with self._semaphore:
+                    result = await self._breaker.call_async(operation)
+                if cache_key is not None:
+                    self._last_known[cache_key] = result
+                return result
+            except CircuitBreakerError:
+                if cache_key is not None and cache_key in self._last_known:
+                    logger.warning(f"Circuit open, serving last known result for {cache_key}")
+                    return self._last_known[cache_key]
+                raise
+            except _CLIENT_ERRORS:
+                raise
             except (ConnectionError, TransportError) as e:
                 if attempt == self.max_retries - 1:
                     raise e
-                delay = self.base_delay * (2**attempt)  # Exponential backoff
+                # Exponential backoff with jitter to avoid synchronized retry storms
+                delay = self.base_delay * (2**attempt) * (0.5 + random.random())
                 await asyncio.sleep(delay)
 
     async def get_producers_count(self) -> int:
@@ -31,6 +103,8 @@ class EventRepository:
         logger.info("Starting get_producers_count")
         
         query = {
+            "track_total_hits": False,
+            "_source": False,
             "aggs": {
                 "unique_producers": {
                     "cardinality": {
@@ -54,6 +128,8 @@ class EventRepository:
                     index=self.index,
                     body=query,
                     size=0,  # We only need the aggregation
+                    request_cache=True,
+                    preference="dashboard",
                     request_timeout=30
                 )
                 logger.info("Search response received")
@@ -65,7 +141,7 @@ class EventRepository:
                 raise
 
         logger.info("Calling _execute_with_retry for producers count")
-        return await self._execute_with_retry(execute)
+        return await self._execute_with_retry(execute, cache_key=("producers_count",))
 
     async def get_event_counts(
         self,
@@ -91,14 +167,22 @@ class EventRepository:
         query = self.query_builder.build_composite_query(
             must_conditions=must_conditions, aggregations=aggs
         )
+        query["track_total_hits"] = False  # Only the buckets are read
 
         async def execute():
             response = await self.client.search(
-                index=self.index, body=query, size=0  # We only need aggregations
+                index=self.index,
+                body=query,
+                size=0,  # We only need aggregations
+                request_cache=True,
+                preference="dashboard",
             )
             return self._process_time_series_response(response)
 
-        return await self._execute_with_retry(execute)
+        return await self._execute_with_retry(
+            execute,
+            cache_key=("event_counts", start_time, end_time, event_name, event_type, interval),
+        )
 
     async def get_user_events(
         self,
@@ -125,15 +209,21 @@ class EventRepository:
 
         query = self.query_builder.build_composite_query(
             must_conditions=must_conditions,
-            source_fields=["event_name", "timestamp", "type", "event_data"],
+            source_fields=_USER_EVENT_SOURCE,
             pagination=pagination,
         )
+        body = self.query_builder.to_bytes(query)
 
         async def execute():
-            response = await self.client.search(index=self.index, body=query)
+            response = await self.client.search(index=self.index, body=body)
             return self._process_user_events_response(response)
 
-        return await self._execute_with_retry(execute)
+        return await self._execute_with_retry(
+            execute,
+            cache_key=(
+                "user_events", user_id, start_time, end_time, event_name, page_token, page_size
+            ),
+        )
 
     async def get_error_summary(
         self, start_time: str, end_time: str, interval: Optional[str] = None
@@ -147,7 +237,10 @@ class EventRepository:
         aggs = {
             "aggs": {
                 "errors_by_name": {
-                    "terms": {"field": "error_name", "size": 100},
+                    # Errors are a small slice of the index, so map execution is cheaper
+                    **self.query_builder.build_terms_aggregation(
+                        "error_name", size=100, execution_hint="map"
+                    ),
                     "aggs": {"latest_occurrence": {"max": {"field": "timestamp"}}},
                 }
             }
@@ -166,10 +259,18 @@ class EventRepository:
         )
 
         async def execute():
-            response = await self.client.search(index=self.index, body=query, size=0)
+            response = await self.client.search(
+                index=self.index,
+                body=query,
+                size=0,
+                request_cache=True,
+                preference="dashboard",
+            )
             return self._process_error_summary_response(response, interval)
 
-        return await self._execute_with_retry(execute)
+        return await self._execute_with_retry(
+            execute, cache_key=("error_summary", start_time, end_time, interval)
+        )
 
     async def get_path_analytics(
         self, start_time: str, end_time: str, limit: int = 10
@@ -182,7 +283,7 @@ class EventRepository:
         aggs = {
             "aggs": {
                 "popular_paths": {
-                    "terms": {"field": "path", "size": limit},
+                    **self.query_builder.build_terms_aggregation("path", size=limit),
                     "aggs": {
                         "average_status": {"avg": {"field": "status_code"}},
                         "error_count": {
@@ -196,12 +297,57 @@ class EventRepository:
         query = self.query_builder.build_composite_query(
             must_conditions=must_conditions, aggregations=aggs
         )
+        query["track_total_hits"] = False  # Only the buckets are read
 
         async def execute():
-            response = await self.client.search(index=self.index, body=query, size=0)
+            response = await self.client.search(
+                index=self.index,
+                body=query,
+                size=0,
+                request_cache=True,
+                preference="dashboard",
+            )
             return self._process_path_analytics_response(response)
 
-        return await self._execute_with_retry(execute)
+        return await self._execute_with_retry(
+            execute, cache_key=("path_analytics", start_time, end_time, limit)
+        )
+
+    async def multi_gauge_counts(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> List[Dict]:
+        """
+        Get the active chat, medium chat and thread user gauges in one _msearch
+        round-trip. Results are returned in that order.
+        """
+        gauges = [
+            ActiveChatUsersGauge(self.client),
+            MediumChatUsersGauge(self.client),
+            ThreadUsersGauge(self.client),
+        ]
+        queries = [gauge.build_query(start_date, end_date) for gauge in gauges]
+
+        body = []
+        for gauge, query in zip(gauges, queries):
+            body.append(
+                {"index": gauge.index, "request_cache": True, "preference": "dashboard"}
+            )
+            body.append({**query, "size": 0})
+
+        async def execute():
+            return await self.client.msearch(body=body)
+
+        response = await self._execute_with_retry(
+            execute, cache_key=("multi_gauge_counts", start_date, end_date)
+        )
+
+        # Responses come back in request order, so route them by position
+        return [
+            gauge.process_response(gauge_response, start_date, end_date)
+            for gauge, gauge_response in zip(gauges, response["responses"])
+        ]
 
     def _process_time_series_response(self, response: Dict) -> List[Dict]:
         """Process the response from get_event_counts query into time series format."""
@@ -217,12 +363,7 @@ class EventRepository:
         """Process the response from get_user_events query."""
         hits = response["hits"]["hits"]
         events = [
-            {
-                "event_name": hit["_source"]["event_name"],
-                "timestamp": hit["_source"]["timestamp"],
-                "type": hit["_source"]["type"],
-                "event_data": hit["_source"]["event_data"],
-            }
+            dict(zip(USER_EVENT_FIELDS, _get_user_event_fields(hit["_source"])))
             for hit in hits
         ]
 
@@ -231,7 +372,7 @@ class EventRepository:
         # Add next page token if there are more results
         if hits:
             last_hit = hits[-1]
-            result["next_page_token"] = f"{last_hit['sort'][0]},{last_hit['sort'][1]}"
+            result["next_page_token"] = ",".join(map(str, last_hit["sort"][:2]))
 
         return result
 
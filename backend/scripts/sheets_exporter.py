@@ -1,5 +1,9 @@
 import os
+import re
+import hashlib
 import logging
+import threading
+import orjson
 from datetime import datetime, timedelta
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
@@ -18,6 +22,19 @@ SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 SPREADSHEET_ID = os.getenv('GOOGLE_SHEET_ID')
 DATA_RANGE = 'data!A1:Z100'  # Range for both metrics and targets
 
+# Sheets service shared across exports so its authorized HTTP session is reused
+_service = None
+_service_creds = None
+_service_lock = threading.Lock()
+
+# Processed results keyed by a hash of the raw sheet values, so unchanged sheets skip reprocessing
+_processed_cache = {}
+PROCESSED_CACHE_SIZE = 16
+
+# Cell formats accepted by int() and float(), checked up front instead of raising per empty/bad cell
+INT_CELL = re.compile(r'[+-]?\d+')
+FLOAT_CELL = re.compile(r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?')
+
 def get_credentials():
     creds = None
     # The file token.json stores the user's access and refresh tokens
@@ -38,19 +55,46 @@ def get_credentials():
     
     return creds
 
-def get_sheet_data(service, spreadsheet_id, range_name):
+def get_service():
+    """Return the shared Sheets service, rebuilding it only once its credentials stop being valid."""
+    global _service, _service_creds
+    with _service_lock:
+        if _service is None or not _service_creds.valid:
+            _service_creds = get_credentials()
+            _service = build('sheets', 'v4', credentials=_service_creds)
+        return _service
+
+def get_sheet_ranges(service, spreadsheet_id, ranges):
+    """Read several ranges in a single batchGet call, returning one list of rows per range."""
     try:
-        result = service.spreadsheets().values().get(
+        result = service.spreadsheets().values().batchGet(
             spreadsheetId=spreadsheet_id,
-            range=range_name
+            ranges=ranges
         ).execute()
-        return result.get('values', [])
+        value_ranges = result.get('valueRanges', [])
+        return [value_range.get('values', []) for value_range in value_ranges]
     except Exception as e:
         logger.error(f"Error reading sheet data: {str(e)}")
-        return []
+        return [[] for _ in ranges]
+
+def get_sheet_data(service, spreadsheet_id, range_name):
+    values = get_sheet_ranges(service, spreadsheet_id, [range_name])
+    return values[0] if values else []
 
 def process_sheet_data(data):
-    """Process the raw sheet data into the required format."""
+    """Process the raw sheet data into the required format, reusing the result for unchanged data."""
+    key = hashlib.blake2b(orjson.dumps(data), digest_size=16).digest()
+    cached = _processed_cache.get(key)
+    if cached is None:
+        cached = _process_sheet_data(data)
+        if len(_processed_cache) >= PROCESSED_CACHE_SIZE:
+            _processed_cache.clear()
+        _processed_cache[key] = cached
+
+    # Hand out copies so callers can't modify the cached result
+    return {period: dict(values) for period, values in cached.items()}
+
+def _process_sheet_data(data):
     # Extract headers
     headers = data[0] if data else []
     
@@ -58,36 +102,32 @@ def process_sheet_data(data):
     result = {}
     time_periods = ['All Time', 'Last 30 Days', 'Last 7 Days', 'Last 3 Days', 'Last 24 Hours']
     
+    # Index rows by time period once; the first row for a period wins
+    rows_by_period = {}
+    for row in data[1:]:  # Skip header row
+        if row:
+            rows_by_period.setdefault(row[0], row)
+
     for period in time_periods:
         result[period] = {}
-        period_row = None
-        
-        # Find the row for this time period
-        for row in data[1:]:  # Skip header row
-            if row and row[0] == period:
-                period_row = row
-                break
+        period_row = rows_by_period.get(period)
         
         if period_row:
+            row_length = len(period_row)
             # Process metrics (column A) and targets (column B)
-            for i, header in enumerate(headers):
-                if i < len(period_row):
-                    try:
-                        # Get metric value from column A
-                        value = int(period_row[i]) if period_row[i].strip() else 0
-                        result[period][header] = value
-                        
-                        # Get target value from column B if it exists
-                        if i + 1 < len(period_row):
-                            try:
-                                target_value = float(period_row[i + 1]) if period_row[i + 1].strip() else None
-                                if target_value is not None:
-                                    result[period][f"{header} Target"] = target_value
-                            except (ValueError, IndexError):
-                                pass
-                    except (ValueError, AttributeError):
-                        value = 0
-                        result[period][header] = value
+            for i, (header, cell) in enumerate(zip(headers, period_row)):
+                # Get metric value from column A; unparseable cells count as 0 and skip their target
+                cell = cell.strip()
+                if cell and not INT_CELL.fullmatch(cell):
+                    result[period][header] = 0
+                    continue
+                result[period][header] = int(cell) if cell else 0
+                
+                # Get target value from column B if it exists
+                if i + 1 < row_length:
+                    target_cell = period_row[i + 1].strip()
+                    if FLOAT_CELL.fullmatch(target_cell):
+                        result[period][f"{header} Target"] = float(target_cell)
 
     return result
 
@@ -97,8 +137,7 @@ def export_to_sheets():
         logger.info("Starting analytics export")
         logger.info("Starting export to Google Sheets")
 
-        creds = get_credentials()
-        service = build('sheets', 'v4', credentials=creds)
+        service = get_service()
 
         # Get data from the sheet
         data = get_sheet_data(service, SPREADSHEET_ID, DATA_RANGE)
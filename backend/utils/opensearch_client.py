@@ -0,0 +1,87 @@
+"""
+Helpers for constructing the AsyncOpenSearch client shared by the repositories and gauges.
+"""
+from typing import Any, List, Union
+
+import aiohttp
+import orjson
+from opensearchpy import AsyncOpenSearch
+from opensearchpy._async.compat import get_running_loop
+from opensearchpy._async.http_aiohttp import OpenSearchClientResponse
+from opensearchpy.compat import string_types
+from opensearchpy.connection.http_async import AsyncHttpConnection
+from opensearchpy.exceptions import SerializationError
+from opensearchpy.serializer import JSONSerializer
+
+
+class OrjsonSerializer(JSONSerializer):
+    """JSONSerializer that encodes and decodes request/response bodies with orjson."""
+
+    def loads(self, s: Union[str, bytes]) -> Any:
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError as e:
+            raise SerializationError(s, e)
+
+    def dumps(self, data: Any) -> str:
+        # don't serialize strings
+        if isinstance(data, string_types):
+            return data
+
+        try:
+            return orjson.dumps(
+                data, default=self.default, option=orjson.OPT_NON_STR_KEYS
+            ).decode("utf-8")
+        except TypeError as e:
+            raise SerializationError(data, e)
+
+
+class KeepAliveHttpConnection(AsyncHttpConnection):
+    """
+    AsyncHttpConnection whose pooled connections stay open for `keepalive_timeout`
+    seconds instead of aiohttp's 15s default, so idle gaps between dashboard polls
+    don't force a fresh TLS handshake.
+    """
+
+    keepalive_timeout = 300
+
+    async def _create_aiohttp_session(self) -> None:
+        # Mirrors AsyncHttpConnection._create_aiohttp_session apart from the connector options
+        if self.loop is None:
+            self.loop = get_running_loop()
+        self.session = aiohttp.ClientSession(
+            headers=self.headers,
+            skip_auto_headers=("accept", "accept-encoding"),
+            auto_decompress=True,
+            cookie_jar=aiohttp.DummyCookieJar(),
+            response_class=OpenSearchClientResponse,
+            connector=aiohttp.TCPConnector(
+                limit=self._limit,
+                use_dns_cache=True,
+                ssl=self._ssl_context,
+                keepalive_timeout=self.keepalive_timeout,
+            ),
+            trust_env=self._trust_env,
+        )
+
+
+def create_opensearch_client(hosts: List[Any], **kwargs) -> AsyncOpenSearch:
+    """
+    Create the AsyncOpenSearch client used by the dashboard.
+
+    The repositories and gauges expect a long-lived client built here at application
+    startup, so connections are pooled (up to 32 per host) and kept alive between polls.
+    Requests and responses are gzip-compressed; aiohttp decompresses responses transparently.
+
+    Args:
+        hosts: Hosts to connect to, as accepted by AsyncOpenSearch
+        **kwargs: Extra client options (http_auth, use_ssl, verify_certs, ...)
+
+    Returns:
+        AsyncOpenSearch client using orjson for (de)serialization
+    """
+    kwargs.setdefault("serializer", OrjsonSerializer())
+    kwargs.setdefault("connection_class", KeepAliveHttpConnection)
+    kwargs.setdefault("maxsize", 32)  # AsyncHttpConnection's connector limit per host
+    kwargs.setdefault("http_compress", True)
+    return AsyncOpenSearch(hosts=hosts, **kwargs)
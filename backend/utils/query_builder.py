@@ -1,13 +1,90 @@
-from typing import Dict, Optional
-from datetime import datetime
-from dateutil.parser import parse
+import io
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple, Union
+from datetime import datetime, timedelta
+import orjson
+
+# Interval -> (date_histogram interval key, value); unknown intervals fall back to 1d
+_INTERVAL_TABLE = {
+    "hour": ("fixed_interval", "1h"),
+    "day": ("fixed_interval", "1d"),
+    "week": ("calendar_interval", "week"),
+    "month": ("calendar_interval", "month"),
+}
+_DEFAULT_INTERVAL = ("fixed_interval", "1d")
+_DATE_HIST_BASE = {
+    "field": "timestamp",
+    "min_doc_count": 0,
+    "format": "yyyy-MM-dd'T'HH:mm:ssZ",
+}
+
+# Sort order for search_after pagination; _id breaks timestamp ties. Shared by
+# every paginated query, so it must never be mutated
+_SORT = ({"timestamp": "desc"}, {"_id": "desc"})
+
+# Pre-serialized bodies for the hottest query shapes; only the values are substituted
+_ISO_TIMESTAMP = re.compile(
+    r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?(?:Z|[+-]\d{2}:?\d{2})?",
+    re.ASCII,
+)
+_DATE_RANGE_TEMPLATE = b'{"range":{"timestamp":{"gte":"%s","lte":"%s"}}}'
+_PAGINATED_TEMPLATE = b'{"sort":[{"timestamp":"desc"},{"_id":"desc"}],"size":%d}'
+
+# Flush thresholds for _bulk request bodies
+BULK_MAX_DOCS = 500
+BULK_MAX_BYTES = 100 * 1024 * 1024
+
+
+def _parse_timestamp(value: str) -> Optional[datetime]:
+    # Only full ISO date-times are split. Partial dates like "2024-01" mean the start of
+    # the period to OpenSearch, and a lenient parser would fill the gaps from today instead
+    if len(value) <= 10 or value[10] != "T":
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _is_hour_aligned(value: datetime) -> bool:
+    return value.minute == 0 and value.second == 0 and value.microsecond == 0
+
+
+@lru_cache(maxsize=64)
+def _aggregation_template(agg_field: str, interval: Optional[str], agg_page_size: int) -> Dict:
+    aggs = {}
+
+    if interval:
+        key, value = _INTERVAL_TABLE.get(interval, _DEFAULT_INTERVAL)
+        date_histogram = _DATE_HIST_BASE.copy()
+        date_histogram[key] = value
+
+        aggs["time_buckets"] = {"date_histogram": date_histogram}
+
+    aggs[f"{agg_field}_buckets"] = {
+        "composite": {
+            "size": agg_page_size,
+            "sources": [{agg_field: {"terms": {"field": agg_field}}}],
+        }
+    }
+
+    return {"aggs": aggs}
 
 
 class OpenSearchQueryBuilder:
-    def build_date_range_query(self, start_time: str, end_time: str) -> Dict:
+    # Stateless: every method is a staticmethod, so instances carry no __dict__
+    __slots__ = ()
+
+    @staticmethod
+    def build_date_range_query(start_time: str, end_time: str) -> Dict:
         """
         Build a date range query for OpenSearch.
 
+        Ranges covering at least one whole hour are split into an un-rounded head,
+        an hour-aligned middle and an un-rounded tail. The middle clause stays identical
+        across calls within the same hour, so OpenSearch can reuse its cached filter.
+
         Args:
             start_time: ISO format timestamp
             end_time: ISO format timestamp
@@ -15,74 +92,268 @@ class OpenSearchQueryBuilder:
         Returns:
             Dict containing the date range query
         """
-        return {"range": {"timestamp": {"gte": start_time, "lte": end_time}}}
+        single_range = {"range": {"timestamp": {"gte": start_time, "lte": end_time}}}
+
+        # Epoch millis, datetimes etc. are serialized as they are, as before
+        if not isinstance(start_time, str) or not isinstance(end_time, str):
+            return single_range
+
+        start = _parse_timestamp(start_time)
+        end = _parse_timestamp(end_time)
+        if start is None or end is None:
+            # Not a full timestamp (e.g. "2024-01" or date math like "now-1d"), leave it to OpenSearch
+            return single_range
+
+        # One naive and one aware bound can't be compared, so send them through unchanged
+        if (start.tzinfo is None) != (end.tzinfo is None):
+            return single_range
+
+        # Already-rounded bounds are cacheable as they are
+        if _is_hour_aligned(start) and _is_hour_aligned(end):
+            return single_range
+
+        floor_h = start
+        if not _is_hour_aligned(start):
+            try:
+                floor_h = start.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+            except OverflowError:
+                # Within the last hour of datetime.max, nothing to split
+                return single_range
+        ceil_h = end.replace(minute=0, second=0, microsecond=0)
+
+        if ceil_h <= floor_h:
+            return single_range
 
+        floor_iso = floor_h.isoformat()
+        ceil_iso = ceil_h.isoformat()
+
+        should = []
+        if floor_h > start:
+            should.append({"range": {"timestamp": {"gte": start_time, "lt": floor_iso}}})
+        if ceil_h < end:
+            should.append({"range": {"timestamp": {"gte": floor_iso, "lt": ceil_iso}}})
+            should.append({"range": {"timestamp": {"gte": ceil_iso, "lte": end_time}}})
+        else:
+            should.append({"range": {"timestamp": {"gte": floor_iso, "lte": end_time}}})
+
+        return {"bool": {"should": should, "minimum_should_match": 1}}
+
+    @staticmethod
+    def build_date_range_query_bytes(start_time: str, end_time: str) -> bytes:
+        """
+        Build a single date range clause as pre-serialized JSON.
+
+        Args:
+            start_time: ISO format timestamp
+            end_time: ISO format timestamp
+
+        Returns:
+            JSON bytes of the range clause
+
+        Raises:
+            ValueError: If either timestamp is not ISO formatted
+        """
+        for value in (start_time, end_time):
+            if not _ISO_TIMESTAMP.fullmatch(value):
+                raise ValueError(f"Not an ISO format timestamp: {value!r}")
+        return _DATE_RANGE_TEMPLATE % (start_time.encode(), end_time.encode())
+
+    @staticmethod
     def build_aggregation_query(
-        self, agg_field: str, interval: Optional[str] = None
+        agg_field: str,
+        interval: Optional[str] = None,
+        agg_page_size: int = 1000,
+        agg_after: Optional[Dict] = None,
     ) -> Dict:
         """
         Build an aggregation query for OpenSearch.
 
+        Buckets for agg_field come from a composite aggregation, one page at a time;
+        pass the previous response's after key (see get_after_key) as agg_after
+        to fetch the next page.
+
         Args:
             agg_field: Field to aggregate on
             interval: Time interval for date histogram aggregation ('hour', 'day', 'week', 'month')
+            agg_page_size: Number of agg_field buckets per page
+            agg_after: after_key of the previous page, if any
 
         Returns:
-            Dict containing the aggregation query
+            Dict containing the aggregation query. The dict is cached and shared
+            between calls, so callers must not mutate it.
         """
-        # Define interval mappings and types
-        fixed_intervals = {"hour": "1h", "day": "1d"}
-        calendar_intervals = {"week": "week", "month": "month"}
+        query = _aggregation_template(agg_field, interval, agg_page_size)
+        if not agg_after:
+            return query
 
-        aggs = {}
+        bucket_name = f"{agg_field}_buckets"
+        composite = {**query["aggs"][bucket_name]["composite"], "after": agg_after}
+        return {"aggs": {**query["aggs"], bucket_name: {"composite": composite}}}
 
-        if interval:
-            date_histogram = {
-                "field": "timestamp",
-                "min_doc_count": 0,
-                "format": "yyyy-MM-dd'T'HH:mm:ssZ",
+    @staticmethod
+    def build_date_range_agg(
+        ranges: Sequence[Tuple[Any, Any]], metric_field: str, metric: str = "sum"
+    ) -> Dict:
+        """
+        Build a date_range aggregation over explicit, caller-supplied buckets.
+
+        All buckets are computed in a single pass, so callers that issue one
+        build_date_range_query search per bucket (directly or via _msearch) should
+        switch to this single-request form.
+
+        Args:
+            ranges: (from, to) bounds per bucket, as epoch milliseconds
+            metric_field: Field to compute the metric on
+            metric: Metric aggregation to apply per bucket ('sum', 'avg', 'max', ...)
+
+        Returns:
+            Dict containing the aggregation query
+        """
+        return {
+            "aggs": {
+                "range": {
+                    "date_range": {
+                        "field": "timestamp",
+                        "format": "epoch_millis",
+                        "ranges": [{"from": start, "to": end} for start, end in ranges],
+                    },
+                    "aggs": {f"{metric}_value": {metric: {"field": metric_field}}},
+                }
             }
+        }
+
+    @staticmethod
+    def build_terms_aggregation(
+        agg_field: str, size: int = 100, execution_hint: Optional[str] = None
+    ) -> Dict:
+        """
+        Build a terms aggregation sized to what the caller actually reads.
 
-            if interval in fixed_intervals:
-                date_histogram["fixed_interval"] = fixed_intervals[interval]
-            elif interval in calendar_intervals:
-                date_histogram["calendar_interval"] = calendar_intervals[interval]
-            else:
-                # Default to 1d fixed interval
-                date_histogram["fixed_interval"] = "1d"
+        Callers aggregating over a selective filter (a small matched doc set) should
+        pass execution_hint="map" with a small size, which skips building global
+        ordinals for the whole field on every shard.
 
-            aggs["time_buckets"] = {"date_histogram": date_histogram}
+        Args:
+            agg_field: Field to aggregate on
+            size: Number of buckets to return
+            execution_hint: Optional terms execution hint ('map', 'global_ordinals')
 
-        aggs[f"{agg_field}_buckets"] = {"terms": {"field": agg_field, "size": 10000}}
+        Returns:
+            Dict containing the terms aggregation
+        """
+        terms = {"field": agg_field, "size": size}
+        if execution_hint:
+            terms["execution_hint"] = execution_hint
+        return {"terms": terms}
 
-        return {"aggs": aggs}
+    @staticmethod
+    def get_after_key(response: Dict, agg_field: str) -> Optional[Dict]:
+        """
+        Get the after_key for the next page of agg_field buckets.
 
+        Args:
+            response: Search response for a query built with build_aggregation_query
+            agg_field: Field that was aggregated on
+
+        Returns:
+            Value to pass as agg_after, or None on the last page
+        """
+        buckets = response.get("aggregations", {}).get(f"{agg_field}_buckets", {})
+        return buckets.get("after_key")
+
+    @staticmethod
     def build_paginated_query(
-        self, search_after: Optional[str] = None, size: int = 100
+        search_after: Optional[Union[Sequence[Any], str]] = None,
+        size: int = 100,
     ) -> Dict:
         """
         Build a paginated query using search_after for deep pagination.
 
         Args:
-            search_after: Token for pagination
+            search_after: Sort values of the last hit on the previous page, already
+                parsed by the caller. A comma-separated token string is still accepted.
             size: Number of results per page
 
         Returns:
-            Dict containing the pagination parameters
+            Dict containing the pagination parameters. Its "sort" value is a shared
+            constant and must not be modified.
         """
         query = {
-            "sort": [{"timestamp": "desc"}, {"_id": "desc"}],
-            "size": min(size, 1000),  # Enforce maximum page size
+            "sort": _SORT,
+            "size": size if size < 1000 else 1000,  # Enforce maximum page size
         }
 
         if search_after:
-            query["search_after"] = search_after.split(",")
+            if isinstance(search_after, str):
+                search_after = search_after.split(",")
+            query["search_after"] = search_after
 
         return query
 
+    @staticmethod
+    def build_paginated_query_bytes(size: int = 100) -> bytes:
+        """
+        Build the first-page pagination parameters as pre-serialized JSON.
+
+        Args:
+            size: Number of results per page
+
+        Returns:
+            JSON bytes of the pagination parameters
+        """
+        return _PAGINATED_TEMPLATE % (size if size < 1000 else 1000)
+
+    @staticmethod
+    def to_bytes(query: Dict) -> bytes:
+        """
+        Serialize a finished query so it can be sent as the request body as-is.
+
+        Args:
+            query: Query that will not be modified further
+
+        Returns:
+            JSON bytes of the query
+        """
+        return orjson.dumps(query)
+
+    @staticmethod
+    def build_bulk_index_body(
+        index: str, docs: Iterable[Tuple[str, Dict]]
+    ) -> Iterator[bytes]:
+        """
+        Build NDJSON bodies for the _bulk endpoint, one chunk per request.
+
+        A chunk is yielded once it holds BULK_MAX_DOCS documents or reaches
+        BULK_MAX_BYTES, so memory stays bounded; the caller POSTs each chunk.
+
+        Args:
+            index: Index to write the documents to
+            docs: (document id, document) pairs
+
+        Returns:
+            Iterator over NDJSON request bodies
+        """
+        buf = io.BytesIO()
+        count = 0
+        for doc_id, doc in docs:
+            buf.write(orjson.dumps({"index": {"_index": index, "_id": doc_id}}))
+            buf.write(b"\n")
+            buf.write(orjson.dumps(doc))
+            buf.write(b"\n")
+            count += 1
+
+            if count >= BULK_MAX_DOCS or buf.tell() >= BULK_MAX_BYTES:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+                count = 0
+
+        if count:
+            yield buf.getvalue()
+
+    @staticmethod
     def build_composite_query(
-        self,
-        must_conditions: list,
+        must_conditions: Sequence[Dict],
         source_fields: Optional[list] = None,
         aggregations: Optional[Dict] = None,
         pagination: Optional[Dict] = None,
@@ -99,15 +370,9 @@ class OpenSearchQueryBuilder:
         Returns:
             Dict containing the complete query
         """
-        query = {"query": {"bool": {"must": must_conditions}}}
-
-        if source_fields:
-            query["_source"] = source_fields
-
-        if aggregations:
-            query.update(aggregations)
-
-        if pagination:
-            query.update(pagination)
-
-        return query
\ No newline at end of file
+        return {
+            "query": {"bool": {"must": must_conditions}},
+            **({"_source": source_fields} if source_fields else {}),
+            **(aggregations or {}),
+            **(pagination or {}),
+        }
\ No newline at end of file